@@ -10,7 +10,7 @@ import seaborn as sns
 import re
 from datetime import datetime
 import numpy as np
-from collections import Counter
+from dc_common import DAY_NAMES, DPI, PNG_METADATA, load_df, dc_reports_only
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -22,54 +22,8 @@ def load_and_clean_data(file_path):
     """データの読み込みとクリーニング"""
     print("データを読み込み中...")
     
-    # CSVファイルを読み込み（改行を含むメッセージに対応）
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    # データを解析
-    data = []
-    current_record = None
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # 新しいレコードの開始（タイムスタンプで始まる行）
-        if line.startswith('2025/'):
-            # 前のレコードを保存
-            if current_record:
-                data.append(current_record)
-            
-            # 新しいレコードを開始
-            parts = line.split(',', 4)  # 最初の4つのカンマで分割
-            if len(parts) >= 5:
-                current_record = {
-                    'timestamp': parts[0],
-                    'report_type': parts[1],
-                    'satellite': parts[2],
-                    'priority': parts[3],
-                    'message': parts[4]
-                }
-        else:
-            # メッセージの続き
-            if current_record:
-                current_record['message'] += '\n' + line
-    
-    # 最後のレコードを追加
-    if current_record:
-        data.append(current_record)
-    
-    # DataFrameに変換
-    df = pd.DataFrame(data)
-    
-    # タイムスタンプをdatetime型に変換
-    df['timestamp'] = pd.to_datetime(df['timestamp'], format='%Y/%m/%d %H:%M:%S JST')
-    
-    # 日付と時間の列を追加
-    df['date'] = df['timestamp'].dt.date
-    df['hour'] = df['timestamp'].dt.hour
-    df['day_of_week'] = df['timestamp'].dt.day_name()
+    # 解析・分類は dc_common で行い、Parquetとプロセス内のキャッシュを共有する
+    df = load_df(file_path)
     
     print(f"データ読み込み完了: {len(df)} レコード")
     return df
@@ -95,34 +49,21 @@ def analyze_basic_statistics(df):
     priority_counts = df['priority'].value_counts()
     for priority, count in priority_counts.items():
         print(f"  優先度 {priority}: {count:,} ({count/len(df)*100:.1f}%)")
+    
+    return report_type_counts, satellite_counts
 
 def analyze_disaster_types(df):
     """災害タイプの分析"""
     print("\n=== 災害タイプ分析 ===")
     
-    # DC Reportのみを抽出
-    dc_reports = df[df['report_type'] == 'DC Report'].copy()
-    
-    # メッセージから災害タイプを抽出
-    disaster_types = []
-    for message in dc_reports['message']:
-        if '災危通報(気象)' in str(message):
-            disaster_types.append('気象')
-        elif '災危通報(震源)' in str(message):
-            disaster_types.append('地震')
-        elif '災危通報(海上)' in str(message):
-            disaster_types.append('海上')
-        elif '災危通報(洪水)' in str(message):
-            disaster_types.append('洪水')
-        else:
-            disaster_types.append('その他')
-    
-    dc_reports['disaster_type'] = disaster_types
+    # DC Reportのみを抽出（災害タイプは読み込み時に分類済み）
+    dc_reports = dc_reports_only(df)
     
     print("災害タイプ別集計:")
-    disaster_counts = Counter(disaster_types)
+    # カテゴリのコードを数え、メッセージの出現順に並べる
+    disaster_counts = dc_reports['disaster_type'].value_counts(sort=False).reindex(dc_reports['disaster_type'].unique())
     for disaster_type, count in disaster_counts.items():
-        print(f"  {disaster_type}: {count:,} ({count/len(disaster_types)*100:.1f}%)")
+        print(f"  {disaster_type}: {count:,} ({count/len(dc_reports)*100:.1f}%)")
     
     return dc_reports
 
@@ -130,21 +71,23 @@ def analyze_temporal_patterns(df):
     """時間的パターンの分析"""
     print("\n=== 時間的パターン分析 ===")
     
-    # 時間帯別集計
-    hourly_counts = df['hour'].value_counts().sort_index()
+    # 時間帯別集計（0〜23時のヒストグラムをbincountで1回の走査で求め、件数のある時間帯だけ残す）
+    hourly_counts = pd.Series(np.bincount(df['hour'], minlength=24), index=range(24))
+    hourly_counts = hourly_counts[hourly_counts > 0]
     print("時間帯別レポート数:")
     for hour, count in hourly_counts.items():
         print(f"  {hour:02d}時: {count:,}")
     
-    # 曜日別集計
-    day_counts = df['day_of_week'].value_counts()
+    # 曜日別集計（曜日コードのbincountを件数の多い順に並べる）
+    day_counts = pd.Series(np.bincount(df['day_of_week'].cat.codes, minlength=len(DAY_NAMES)), index=DAY_NAMES)
+    day_counts = day_counts[day_counts > 0].sort_values(ascending=False, kind='stable')
     print("\n曜日別レポート数:")
     for day, count in day_counts.items():
         print(f"  {day}: {count:,}")
     
     return hourly_counts, day_counts
 
-def create_visualizations(df, dc_reports, hourly_counts, day_counts):
+def create_visualizations(df, dc_reports, report_type_counts, satellite_counts, hourly_counts, day_counts):
     """可視化の作成"""
     print("\n=== 可視化作成中 ===")
     
@@ -154,12 +97,10 @@ def create_visualizations(df, dc_reports, hourly_counts, day_counts):
     fig.suptitle('QZSS DCレポート分析結果', fontsize=16, fontweight='bold')
     
     # 1. レポートタイプ別分布
-    report_type_counts = df['report_type'].value_counts()
     axes[0, 0].pie(report_type_counts.values, labels=report_type_counts.index, autopct='%1.1f%%')
     axes[0, 0].set_title('レポートタイプ別分布')
     
     # 2. 衛星別分布
-    satellite_counts = df['satellite'].value_counts()
     axes[0, 1].pie(satellite_counts.values, labels=satellite_counts.index, autopct='%1.1f%%')
     axes[0, 1].set_title('衛星別分布')
     
@@ -171,7 +112,9 @@ def create_visualizations(df, dc_reports, hourly_counts, day_counts):
     axes[1, 0].grid(True, alpha=0.3)
     
     # 4. 日別レポート数
-    daily_counts = df['date'].value_counts().sort_index()
+    # 日付カテゴリは日付順に並んでいるので、コードを数えるだけで日付順の件数になる
+    days = df['date'].cat.categories
+    daily_counts = pd.Series(np.bincount(df['date'].cat.codes, minlength=len(days)), index=days)
     axes[1, 1].plot(daily_counts.index, daily_counts.values, marker='o')
     axes[1, 1].set_title('日別レポート数')
     axes[1, 1].set_xlabel('日付')
@@ -180,7 +123,7 @@ def create_visualizations(df, dc_reports, hourly_counts, day_counts):
     axes[1, 1].grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig('dc_reports_analysis.png', dpi=300, bbox_inches='tight')
+    plt.savefig('dc_reports_analysis.png', dpi=DPI, bbox_inches='tight', metadata=PNG_METADATA)
     print("可視化を 'dc_reports_analysis.png' に保存しました")
     
     # 災害タイプ別の可視化（DC Reportのみ）
@@ -189,24 +132,24 @@ def create_visualizations(df, dc_reports, hourly_counts, day_counts):
         disaster_counts = dc_reports['disaster_type'].value_counts()
         plt.pie(disaster_counts.values, labels=disaster_counts.index, autopct='%1.1f%%')
         plt.title('災害タイプ別分布 (DC Reportのみ)')
-        plt.savefig('disaster_types_analysis.png', dpi=300, bbox_inches='tight')
+        plt.savefig('disaster_types_analysis.png', dpi=DPI, bbox_inches='tight', metadata=PNG_METADATA)
         print("災害タイプ分析を 'disaster_types_analysis.png' に保存しました")
 
-def generate_summary_report(df, dc_reports):
+def generate_summary_report(df, dc_reports, report_type_counts, satellite_counts):
     """サマリーレポートの生成"""
     print("\n=== サマリーレポート ===")
     
-    # 基本情報
+    # 基本情報（件数は基本統計の集計結果を使う）
     total_records = len(df)
-    dc_report_count = len(df[df['report_type'] == 'DC Report'])
-    dcx_count = len(df[df['report_type'] == 'DCX'])
+    dc_report_count = report_type_counts.get('DC Report', 0)
+    dcx_count = report_type_counts.get('DCX', 0)
     
     # 期間情報
     start_date = df['timestamp'].min()
     end_date = df['timestamp'].max()
     duration_days = (end_date - start_date).days
     
-    # 衛星情報
+    # 衛星情報（件数は基本統計の衛星別集計から引く）
     satellites = df['satellite'].unique()
     
     # 災害タイプ情報
@@ -234,7 +177,7 @@ def generate_summary_report(df, dc_reports):
 """
     
     for satellite in satellites:
-        count = len(df[df['satellite'] == satellite])
+        count = satellite_counts[satellite]
         report += f"- **{satellite}**: {count:,} 件 ({count/total_records*100:.1f}%)\n"
     
     if len(disaster_types) > 0:
@@ -263,7 +206,7 @@ def main():
     df = load_and_clean_data('dc_reports_boot_00003.csv')
     
     # 基本統計分析
-    analyze_basic_statistics(df)
+    report_type_counts, satellite_counts = analyze_basic_statistics(df)
     
     # 災害タイプ分析
     dc_reports = analyze_disaster_types(df)
@@ -272,10 +215,10 @@ def main():
     hourly_counts, day_counts = analyze_temporal_patterns(df)
     
     # 可視化作成
-    create_visualizations(df, dc_reports, hourly_counts, day_counts)
+    create_visualizations(df, dc_reports, report_type_counts, satellite_counts, hourly_counts, day_counts)
     
     # サマリーレポート生成
-    report = generate_summary_report(df, dc_reports)
+    report = generate_summary_report(df, dc_reports, report_type_counts, satellite_counts)
     
     # レポートをファイルに保存
     with open('dc_reports_analysis_report.md', 'w', encoding='utf-8') as f:
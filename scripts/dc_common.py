@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+QZSS DCレポート解析スクリプト共通処理（CSVの解析・キャッシュ・災害タイプ分類）
+"""
+
+import csv
+import functools
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# タイムスタンプの書式（例: 2025/08/22 06:15:00 JST）
+# 固定長の日時部分と末尾のタイムゾーン表記に分けて扱う
+TIMESTAMP_FORMAT = '%Y/%m/%d %H:%M:%S'
+TIMESTAMP_LENGTH = len('2025/08/22 06:15:00')
+TIMESTAMP_SUFFIX = ' JST'
+
+# 1行を1フィールドとして読むための区切り文字（本文には現れない制御文字）
+LINE_SEPARATOR = '\x1f'
+
+# CSVを一度に読み込む行数（ファイル全体をメモリに載せない）
+CHUNK_LINES = 100_000
+
+# 解析済みファイル（Parquet）に記録する元のCSVの更新時刻（ns）とサイズのキー
+CACHE_KEY_MTIME = 'dc_source_mtime_ns'
+CACHE_KEY_SIZE = 'dc_source_size'
+
+# 8月22日0時以降版のスクリプトで分析する期間の開始時刻
+FILTER_START = pd.Timestamp('2025-08-22 00:00:00')
+
+# 図を保存する解像度の既定値（画面やGitHub上のMarkdownで見るには150dpiで十分）
+DEFAULT_DPI = 150
+
+# 印刷用などで解像度を変えるときに値を指定する環境変数（例: DC_FIGURE_DPI=300）
+DPI_ENV_VAR = 'DC_FIGURE_DPI'
+
+def _figure_dpi():
+    """環境変数から図の解像度を求める（未設定・空なら既定値、不正な値なら警告して既定値）"""
+    value = os.environ.get(DPI_ENV_VAR, '').strip()
+    if not value:
+        return DEFAULT_DPI
+    try:
+        dpi = float(value)
+    except ValueError:
+        dpi = 0
+    if not (0 < dpi < float('inf')):
+        print(f"警告: {DPI_ENV_VAR}={value!r} は解像度として使えないため {DEFAULT_DPI} DPIで保存します",
+              file=sys.stderr)
+        return DEFAULT_DPI
+    return int(dpi) if dpi.is_integer() else dpi
+
+DPI = _figure_dpi()
+
+# PNGに書き込むメタデータ（Softwareを省き、同じ図からは同じファイルが出力されるようにする）
+PNG_METADATA = {'Software': None}
+
+# ヒートマップのセルに値を書き込む上限（これより多いとテキストが重なり描画も遅くなる）
+HEATMAP_ANNOTATE_MAX_CELLS = 50
+
+# 曜日名（pandasのdayofweekの順: Monday=0）
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DAY_NAMES_JP = ['月曜日', '火曜日', '水曜日', '木曜日', '金曜日', '土曜日', '日曜日']
+
+# 分類に使うキーワード（全キーワードを1回の走査でまとめて検出する）
+DISASTER_KEYWORDS = [
+    '災危通報(気象)', '災危通報(震源)', '災危通報(海上)', '災危通報(洪水)',
+    '土砂災害警戒情報', '大雨警報', '洪水警報', '海上濃霧警報', '海上風警報', '氾濫警戒情報',
+]
+# 先読みにすることで重なり合うキーワードも取りこぼさない
+DISASTER_KEYWORD_PATTERN = re.compile('(?=(%s))' % '|'.join(map(re.escape, DISASTER_KEYWORDS)))
+
+# 分類ラベル（classify の条件の並び順、最後は該当なし）
+DISASTER_TYPES = ['気象', '地震', '海上', '洪水', 'その他']
+DISASTER_DETAILS = [
+    '土砂災害警戒情報', '大雨警報', '洪水警報', '気象その他',
+    '地震情報',
+    '海上濃霧警報', '海上風警報', '海上その他',
+    '氾濫警戒情報', '洪水その他',
+    'その他',
+]
+
+def assemble_records(lines):
+    """行（前後の空白除去済み）のSeriesからレコードを組み立てる"""
+    # 新しいレコードの開始（タイムスタンプで始まる行）毎にレコード番号を振る
+    is_header = lines.str.startswith('2025/')
+    record_id = is_header.cumsum()
+    
+    # ヘッダ行を最初の4つのカンマで分割（5列に満たない行は除外）
+    header = lines[is_header].str.split(',', n=4, expand=True).reindex(columns=range(5))
+    header = header[header[4].notna()].astype(object)
+    
+    # メッセージの続きをレコード毎に連結（最初のレコードより前の行は除外）
+    # 全行を改行で一度に連結し、ヘッダ行の先頭に付けた区切り文字の位置で分割し直す
+    body = lines.where(~is_header, LINE_SEPARATOR + header[4])
+    body = body[record_id.isin(record_id[header.index])]
+    messages = '\n'.join(body)[1:].split('\n' + LINE_SEPARATOR) if len(body) else []
+    
+    return pd.DataFrame({
+        'timestamp': header[0].values,
+        'report_type': header[1].values,
+        'satellite': header[2].values,
+        'priority': header[3].values,
+        'message': messages
+    })
+
+def parse_records(file_path):
+    """CSVを解析してレコードのDataFrameを作成"""
+    # CSVファイルを1行1フィールドとしてCパーサでチャンク毎に読み込み（改行を含むメッセージに対応）
+    chunks = []
+    pending = pd.Series([], dtype=object)
+    with pd.read_csv(file_path, header=None, names=['line'], sep=LINE_SEPARATOR, engine='c',
+                     quoting=csv.QUOTE_NONE, dtype=str, na_filter=False, encoding='utf-8',
+                     chunksize=CHUNK_LINES) as reader:
+        for chunk in reader:
+            lines = chunk['line'].str.strip()
+            lines = pd.concat([pending, lines[lines != '']], ignore_index=True)
+            
+            # 最後のレコードは次のチャンクに続く可能性があるので持ち越す
+            starts = np.flatnonzero(lines.str.startswith('2025/'))
+            last = starts[-1] if len(starts) else len(lines)
+            chunks.append(assemble_records(lines.iloc[:last]))
+            pending = lines.iloc[last:]
+    chunks.append(assemble_records(pending))
+    
+    # DataFrameに変換
+    df = pd.concat(chunks, ignore_index=True)
+    
+    # タイムスタンプをdatetime型に変換
+    # " JST"を書式に含めるとpandasの高速な日時解析が使えず1行ずつstrptimeになるため、
+    # 末尾の表記はまとめて確認し、固定長の日時部分だけを解析する
+    timestamp = df['timestamp']
+    invalid = timestamp.str.slice(TIMESTAMP_LENGTH) != TIMESTAMP_SUFFIX
+    if invalid.any():
+        raise ValueError(f"タイムスタンプの書式が不正です: {timestamp[invalid].iloc[0]!r}")
+    df['timestamp'] = pd.to_datetime(timestamp.str.slice(0, TIMESTAMP_LENGTH), format=TIMESTAMP_FORMAT,
+                                     exact=True, cache=True)
+    
+    # メッセージ本文はArrowの連続バッファに格納し、文字列検索をArrowのカーネルで行う
+    df['message'] = df['message'].astype('string[pyarrow]')
+    
+    # 種類の少ない列はカテゴリ型にして集計を高速化
+    for col in ('report_type', 'satellite', 'priority'):
+        df[col] = df[col].astype('category')
+    
+    return df
+
+def classify(df):
+    """メッセージから災害タイプ（disaster_type）と詳細災害タイプ（disaster_detail）を求める"""
+    # 同じ通報は複数の衛星から繰り返し配信されるので、重複を除いたメッセージだけを分類する
+    codes, unique_messages = pd.factorize(df['message'])
+    
+    # メッセージ毎に1回だけ走査し、含まれるキーワードを表にして両方の分類に使う
+    hits = pd.Series(unique_messages, dtype=object).str.findall(DISASTER_KEYWORD_PATTERN).explode()
+    found = pd.get_dummies(hits).groupby(level=0).any().reindex(
+        index=range(len(unique_messages)), columns=DISASTER_KEYWORDS, fill_value=False)
+    is_weather = found['災危通報(気象)']
+    is_quake = found['災危通報(震源)']
+    is_marine = found['災危通報(海上)']
+    is_flood = found['災危通報(洪水)']
+    
+    # 災害タイプ（ラベルはint8のコードで持ち、そのままカテゴリ型にする）
+    types = np.select([is_weather, is_quake, is_marine, is_flood],
+                      np.arange(4, dtype=np.int8), default=4).astype(np.int8)
+    
+    # 詳細災害タイプ
+    conditions = [
+        is_weather & found['土砂災害警戒情報'],
+        is_weather & found['大雨警報'],
+        is_weather & found['洪水警報'],
+        is_weather,
+        is_quake,
+        is_marine & found['海上濃霧警報'],
+        is_marine & found['海上風警報'],
+        is_marine,
+        is_flood & found['氾濫警戒情報'],
+        is_flood,
+    ]
+    details = np.select(conditions, np.arange(len(conditions), dtype=np.int8),
+                        default=len(conditions)).astype(np.int8)
+    
+    df['disaster_type'] = pd.Categorical.from_codes(types[codes], categories=DISASTER_TYPES)
+    df['disaster_detail'] = pd.Categorical.from_codes(details[codes], categories=DISASTER_DETAILS)
+    return df
+
+def _cache_path(file_path):
+    """CSVに対応する解析済みファイル（Parquet）のパス"""
+    return Path(file_path).with_suffix('.parquet')
+
+def _source_key(file_path):
+    """キャッシュが対応するCSVを識別するキー（更新時刻とサイズ。プロセス内キャッシュと同じ組）"""
+    stat = os.stat(file_path)
+    return {CACHE_KEY_MTIME: str(stat.st_mtime_ns), CACHE_KEY_SIZE: str(stat.st_size)}
+
+def _read_cached_records(cache_path, source_key, since):
+    """CSVと一致する解析済みファイルがあれば (DataFrame, 全件数) を返し、なければ None"""
+    if not cache_path.exists():
+        return None
+    try:
+        parquet_file = pq.ParquetFile(cache_path)
+    except (OSError, pa.ArrowException):
+        # 書き込み途中で失敗したファイルなど、読めないキャッシュは作り直す
+        return None
+    metadata = parquet_file.schema_arrow.metadata or {}
+    # 元のCSVの更新時刻・サイズが記録と一致しない（古い形式を含む）キャッシュは使わない
+    # （時刻の前後だけでは、cp -p などで古い時刻のまま差し替えられたCSVを検出できない）
+    if any(metadata.get(key.encode()) != value.encode() for key, value in source_key.items()):
+        return None
+    total = parquet_file.metadata.num_rows
+    filters = None if since is None else [('timestamp', '>=', since)]
+    df = pd.read_parquet(cache_path, filters=filters)
+    # Parquetからはstring[python]として復元されるためArrow版に戻す
+    df['message'] = df['message'].astype('string[pyarrow]')
+    return df, total
+
+def _write_cached_records(cache_path, df, source_key):
+    """解析・分類済みのDataFrameを元のCSVのキーとともにParquetに保存する"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, **source_key})
+    # 期間を絞って読むときに読み飛ばせるよう、CSVの読み込みと同じ行数ごとに行グループを分ける
+    try:
+        pq.write_table(table, cache_path, compression='zstd', row_group_size=CHUNK_LINES)
+    except OSError as e:
+        # 書き込めない場所（読み取り専用のディレクトリなど）でも解析は続ける
+        print(f"警告: 解析済みファイルを保存できませんでした（{cache_path}）: {e}", file=sys.stderr)
+
+def _load_records(file_path, since=None):
+    """load_records の本体（期間で絞る前の全件数もあわせて返す）"""
+    cache_path = _cache_path(file_path)
+    source_key = _source_key(file_path)
+    cached = _read_cached_records(cache_path, source_key, since)
+    if cached is not None:
+        return cached
+    # 分類結果もカテゴリ型のままキャッシュに保存し、次回以降はキーワード検索も省略する
+    df = classify(parse_records(file_path))
+    _write_cached_records(cache_path, df, source_key)
+    total = len(df)
+    if since is not None:
+        df = df[df['timestamp'] >= since].reset_index(drop=True)
+    return df, total
+
+def load_records(file_path, since=None):
+    """CSVを読み込んで分類する（元のCSVと一致する解析済みファイル（Parquet）があればCSVの解析と分類を省略する）
+
+    since を指定すると、その時刻以降のレコードだけを返す。
+    Parquetから読むときは、期間外の行グループを統計情報で読み飛ばし、残りの行も読み込み時に除く。
+    """
+    return _load_records(file_path, since)[0]
+
+def add_time_columns(df):
+    """日付・時・曜日の列を追加"""
+    # タイムスタンプの整数値（秒）から1回の走査でまとめて求める
+    # （保持する単位はpandasの版やParquetの書き込み方でns・usなどと異なるため、秒に変換してから整数として見る）
+    # 日付と曜日はコードだけを持つカテゴリ型にし、日付オブジェクトや曜日名は種類数分だけ作る
+    seconds = df['timestamp'].to_numpy().astype('datetime64[s]').view(np.int64)
+    days = seconds // 86400
+    weekday = (days + 3) % 7  # 1970/01/01は木曜日
+    day_index, day_codes = np.unique(days, return_inverse=True)
+    df['date'] = pd.Categorical.from_codes(day_codes, categories=day_index.astype('datetime64[D]').astype(object))
+    df['hour'] = (seconds // 3600 % 24).astype(np.int8)
+    df['day_of_week'] = pd.Categorical.from_codes(weekday, categories=DAY_NAMES)
+    df['day_of_week_jp'] = pd.Categorical.from_codes(weekday, categories=DAY_NAMES_JP)
+    return df
+
+@functools.lru_cache(maxsize=4)
+def _load_df(file_path, mtime_ns, size):
+    """load_df の本体（CSVのパス・更新時刻・サイズをキーとしてプロセス内にキャッシュ）"""
+    return add_time_columns(load_records(file_path))
+
+def load_df(file_path):
+    """解析・分類済みのDataFrameを取得（同じプロセス内では2回目以降の解析を省略する）"""
+    stat = os.stat(file_path)
+    df = _load_df(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    # 呼び出し側で列を追加してもキャッシュに影響しないよう浅いコピーを返す
+    return df.copy(deep=False)
+
+@functools.lru_cache(maxsize=4)
+def _load_filtered(file_path, mtime_ns, size):
+    """load_and_filter_data の本体（load_df と同じキーでプロセス内にキャッシュ）"""
+    # 期間外のレコードは読み込み時に除く（元の件数はParquetのメタデータか解析結果から求める）
+    df_filtered, total = _load_records(file_path, since=FILTER_START)
+    
+    # 種類の少ない列はカテゴリ型のまま、期間外にしか現れないカテゴリを除く
+    # （時・曜日・日付は使う箇所でタイムスタンプから求めるので列としては持たない）
+    for col in ('report_type', 'satellite', 'priority', 'disaster_type', 'disaster_detail'):
+        df_filtered[col] = df_filtered[col].cat.remove_unused_categories()
+    return total, df_filtered
+
+def load_and_filter_data(file_path):
+    """データの読み込みと8月22日0時以降のフィルタリング"""
+    print("Loading and filtering data...")
+    
+    stat = os.stat(file_path)
+    total, df_filtered = _load_filtered(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    
+    print(f"Original data: {total} records")
+    print(f"Filtered data (from Aug 22, 00:00): {len(df_filtered)} records")
+    print(f"Filter period: {df_filtered['timestamp'].min()} to {df_filtered['timestamp'].max()}")
+    
+    # 呼び出し側で列を追加してもキャッシュに影響しないよう浅いコピーを返す
+    return df_filtered.copy(deep=False)
+
+def dc_reports_only(df):
+    """DC Reportのみを抽出（DCXにしか現れない分類は除く）"""
+    dc_reports = df[df['report_type'] == 'DC Report'].copy()
+    for col in ('disaster_type', 'disaster_detail'):
+        dc_reports[col] = dc_reports[col].cat.remove_unused_categories()
+    return dc_reports
+
+def render_figures(*tasks):
+    """(描画関数, 引数...) の組を別プロセスで並行して実行し、戻り値（保存したファイル名）を順に返す"""
+    if not tasks:
+        return []
+    # 各図のラスタライズとPNG圧縮は互いに独立なので、図の数だけプロセスを使う
+    with ProcessPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = [executor.submit(fn, *args) for fn, *args in tasks]
+        return [future.result() for future in futures]
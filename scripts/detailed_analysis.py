@@ -6,11 +6,10 @@ QZSS DCレポート詳細分析スクリプト
 
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
 import re
 from datetime import datetime, timedelta
 import numpy as np
-from collections import Counter
+from dc_common import DPI, HEATMAP_ANNOTATE_MAX_CELLS, PNG_METADATA, load_df, dc_reports_only
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -22,46 +21,8 @@ def load_data(file_path):
     """データの読み込み"""
     print("データを読み込み中...")
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    data = []
-    current_record = None
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        if line.startswith('2025/'):
-            if current_record:
-                data.append(current_record)
-            
-            parts = line.split(',', 4)
-            if len(parts) >= 5:
-                current_record = {
-                    'timestamp': parts[0],
-                    'report_type': parts[1],
-                    'satellite': parts[2],
-                    'priority': parts[3],
-                    'message': parts[4]
-                }
-        else:
-            if current_record:
-                current_record['message'] += '\n' + line
-    
-    if current_record:
-        data.append(current_record)
-    
-    df = pd.DataFrame(data)
-    df['timestamp'] = pd.to_datetime(df['timestamp'], format='%Y/%m/%d %H:%M:%S JST')
-    df['date'] = df['timestamp'].dt.date
-    df['hour'] = df['timestamp'].dt.hour
-    df['day_of_week'] = df['timestamp'].dt.day_name()
-    df['day_of_week_jp'] = df['timestamp'].dt.day_name().map({
-        'Monday': '月曜日', 'Tuesday': '火曜日', 'Wednesday': '水曜日',
-        'Thursday': '木曜日', 'Friday': '金曜日', 'Saturday': '土曜日', 'Sunday': '日曜日'
-    })
+    # 解析・分類は dc_common で行い、Parquetとプロセス内のキャッシュを共有する
+    df = load_df(file_path)
     
     print(f"データ読み込み完了: {len(df)} レコード")
     return df
@@ -70,44 +31,14 @@ def analyze_message_content(df):
     """メッセージ内容の詳細分析"""
     print("\n=== メッセージ内容分析 ===")
     
-    dc_reports = df[df['report_type'] == 'DC Report'].copy()
-    
-    # 災害タイプの詳細分類
-    disaster_details = []
-    for message in dc_reports['message']:
-        msg_str = str(message)
-        if '災危通報(気象)' in msg_str:
-            if '土砂災害警戒情報' in msg_str:
-                disaster_details.append('土砂災害警戒情報')
-            elif '大雨警報' in msg_str:
-                disaster_details.append('大雨警報')
-            elif '洪水警報' in msg_str:
-                disaster_details.append('洪水警報')
-            else:
-                disaster_details.append('気象その他')
-        elif '災危通報(震源)' in msg_str:
-            disaster_details.append('地震情報')
-        elif '災危通報(海上)' in msg_str:
-            if '海上濃霧警報' in msg_str:
-                disaster_details.append('海上濃霧警報')
-            elif '海上風警報' in msg_str:
-                disaster_details.append('海上風警報')
-            else:
-                disaster_details.append('海上その他')
-        elif '災危通報(洪水)' in msg_str:
-            if '氾濫警戒情報' in msg_str:
-                disaster_details.append('氾濫警戒情報')
-            else:
-                disaster_details.append('洪水その他')
-        else:
-            disaster_details.append('その他')
-    
-    dc_reports['disaster_detail'] = disaster_details
+    # 詳細災害タイプは読み込み時に災害タイプと同じ1回の走査で分類済み
+    dc_reports = dc_reports_only(df)
     
     print("詳細災害タイプ別集計:")
-    detail_counts = Counter(disaster_details)
+    # カテゴリのコードを数え、メッセージの出現順に並べる
+    detail_counts = dc_reports['disaster_detail'].value_counts(sort=False).reindex(dc_reports['disaster_detail'].unique())
     for detail_type, count in detail_counts.items():
-        print(f"  {detail_type}: {count:,} ({count/len(disaster_details)*100:.1f}%)")
+        print(f"  {detail_type}: {count:,} ({count/len(dc_reports)*100:.1f}%)")
     
     return dc_reports
 
@@ -116,7 +47,7 @@ def analyze_temporal_patterns_detailed(df):
     print("\n=== 詳細時間的パターン分析 ===")
     
     # 時間帯別の詳細分析
-    hourly_analysis = df.groupby(['hour', 'report_type']).size().unstack(fill_value=0)
+    hourly_analysis = df.groupby(['hour', 'report_type'], observed=True).size().unstack(fill_value=0)
     
     print("時間帯別レポートタイプ分布:")
     for hour in range(24):
@@ -128,7 +59,7 @@ def analyze_temporal_patterns_detailed(df):
                 print(f"  {hour:02d}時: DC Report {dc_report_count}, DCX {dcx_count} (合計 {total})")
     
     # 日別の詳細分析
-    daily_analysis = df.groupby(['date', 'report_type']).size().unstack(fill_value=0)
+    daily_analysis = df.groupby(['date', 'report_type'], observed=True).size().unstack(fill_value=0)
     
     print("\n日別レポートタイプ分布:")
     for date in sorted(daily_analysis.index):
@@ -144,7 +75,7 @@ def analyze_satellite_performance(df):
     print("\n=== 衛星パフォーマンス分析 ===")
     
     # 衛星別のレポートタイプ分布
-    satellite_analysis = df.groupby(['satellite', 'report_type']).size().unstack(fill_value=0)
+    satellite_analysis = df.groupby(['satellite', 'report_type'], observed=True).size().unstack(fill_value=0)
     
     print("衛星別レポートタイプ分布:")
     for satellite in satellite_analysis.index:
@@ -154,7 +85,7 @@ def analyze_satellite_performance(df):
         print(f"  {satellite}: DC Report {dc_report_count}, DCX {dcx_count} (合計 {total})")
     
     # 衛星別の時間帯分布
-    satellite_hourly = df.groupby(['satellite', 'hour']).size().unstack(fill_value=0)
+    satellite_hourly = df.groupby(['satellite', 'hour'], observed=True).size().unstack(fill_value=0)
     
     return satellite_analysis, satellite_hourly
 
@@ -205,18 +136,26 @@ def create_detailed_visualizations(df, dc_reports, hourly_analysis, daily_analys
         plt.title('詳細災害タイプ分布 (DC Reportのみ)')
     
     plt.tight_layout()
-    plt.savefig('detailed_analysis.png', dpi=300, bbox_inches='tight')
+    plt.savefig('detailed_analysis.png', dpi=DPI, bbox_inches='tight', metadata=PNG_METADATA)
     print("詳細分析可視化を 'detailed_analysis.png' に保存しました")
     
     # 時間帯別ヒートマップ
     plt.figure(figsize=(12, 8))
-    hourly_pivot = df.groupby(['hour', 'report_type']).size().unstack(fill_value=0)
-    if 'DC Report' in hourly_pivot.columns and 'DCX' in hourly_pivot.columns:
-        sns.heatmap(hourly_pivot.T, annot=True, fmt='d', cmap='YlOrRd')
+    if 'DC Report' in hourly_analysis.columns and 'DCX' in hourly_analysis.columns:
+        # 2×24程度の小さな表なので、imshowに直接描画してセルの値を書き込む
+        heatmap = hourly_analysis.T.values
+        plt.imshow(heatmap, aspect='auto', cmap='YlOrRd')
+        plt.colorbar()
+        if heatmap.size <= HEATMAP_ANNOTATE_MAX_CELLS:
+            for (i, j), value in np.ndenumerate(heatmap):
+                plt.text(j, i, f'{value:d}', ha='center', va='center',
+                         color='white' if value > heatmap.max() / 2 else 'black')
+        plt.xticks(range(len(hourly_analysis.index)), hourly_analysis.index)
+        plt.yticks(range(len(hourly_analysis.columns)), hourly_analysis.columns)
         plt.title('時間帯別レポートタイプヒートマップ')
         plt.xlabel('時間')
         plt.ylabel('レポートタイプ')
-        plt.savefig('hourly_heatmap.png', dpi=300, bbox_inches='tight')
+        plt.savefig('hourly_heatmap.png', dpi=DPI, bbox_inches='tight', metadata=PNG_METADATA)
         print("時間帯別ヒートマップを 'hourly_heatmap.png' に保存しました")
 
 def generate_detailed_report(df, dc_reports, hourly_analysis, daily_analysis, satellite_analysis):
@@ -233,40 +172,29 @@ def generate_detailed_report(df, dc_reports, hourly_analysis, daily_analysis, sa
     end_date = df['timestamp'].max()
     duration_days = (end_date - start_date).days
     
-    # 衛星情報
+    # 衛星情報（件数は analyze_satellite_performance の集計表から引く）
     satellites = df['satellite'].unique()
+    satellite_totals = satellite_analysis.sum(axis=1)
+    satellite_types = satellite_analysis.reindex(columns=['DC Report', 'DCX'], fill_value=0)
     
     # 災害タイプ情報
     if len(dc_reports) > 0:
         disaster_details = dc_reports['disaster_detail'].value_counts()
         most_common_detail = disaster_details.index[0] if len(disaster_details) > 0 else "なし"
         
-        # 災害タイプを再分類
-        disaster_types = []
-        for detail in disaster_details.index:
-            if '海上' in detail:
-                disaster_types.append('海上')
-            elif '気象' in detail or '土砂' in detail:
-                disaster_types.append('気象')
-            elif '地震' in detail:
-                disaster_types.append('地震')
-            elif '洪水' in detail or '氾濫' in detail:
-                disaster_types.append('洪水')
-            else:
-                disaster_types.append('その他')
-        
-        disaster_type_counts = pd.Series(disaster_types).value_counts()
+        # 災害タイプ別の件数（詳細災害タイプと同時に分類した disaster_type 列を数える）
+        disaster_type_counts = dc_reports['disaster_type'].value_counts()
         most_common_disaster = disaster_type_counts.index[0] if len(disaster_type_counts) > 0 else "なし"
     else:
-        disaster_types = pd.Series()
         disaster_details = pd.Series()
         disaster_type_counts = pd.Series()
         most_common_disaster = "なし"
         most_common_detail = "なし"
     
     # 時間帯分析
-    peak_hour = df['hour'].value_counts().index[0]
-    peak_hour_count = df['hour'].value_counts().iloc[0]
+    hour_counts = df['hour'].value_counts()
+    peak_hour = hour_counts.index[0]
+    peak_hour_count = hour_counts.iloc[0]
     
     # レポート生成
     report = f"""
@@ -287,9 +215,9 @@ def generate_detailed_report(df, dc_reports, hourly_analysis, daily_analysis, sa
 """
     
     for satellite in satellites:
-        count = len(df[df['satellite'] == satellite])
-        dc_report_sat = len(df[(df['satellite'] == satellite) & (df['report_type'] == 'DC Report')])
-        dcx_sat = len(df[(df['satellite'] == satellite) & (df['report_type'] == 'DCX')])
+        count = satellite_totals[satellite]
+        dc_report_sat = satellite_types.loc[satellite, 'DC Report']
+        dcx_sat = satellite_types.loc[satellite, 'DCX']
         report += f"- **{satellite}**: {count:,} 件 ({count/total_records*100:.1f}%)\n"
         report += f"  - DC Report: {dc_report_sat:,} 件\n"
         report += f"  - DCX: {dcx_sat:,} 件\n"
@@ -315,7 +243,7 @@ def generate_detailed_report(df, dc_reports, hourly_analysis, daily_analysis, sa
     report += f"\n## 主要な発見\n"
     report += f"1. **データ期間**: {duration_days} 日間にわたる包括的なQZSS DCレポート記録\n"
     report += f"2. **レポート構成**: 実際の災害通報とテストメッセージがほぼ同数\n"
-    report += f"3. **衛星利用**: QZSS-7が最も多く利用されている ({len(df[df['satellite'] == 'QZSS-7'])/total_records*100:.1f}%)\n"
+    report += f"3. **衛星利用**: QZSS-7が最も多く利用されている ({satellite_totals.get('QZSS-7', 0)/total_records*100:.1f}%)\n"
     
     if len(disaster_type_counts) > 0:
         report += f"4. **主要災害**: 海上関連の通報が最多 ({most_common_disaster})\n"
@@ -5,10 +5,13 @@ QZSS DCレポート1時間毎トレンド分析スクリプト
 """
 
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 from datetime import datetime, timedelta
+from dc_common import DPI, FILTER_START, PNG_METADATA, load_and_filter_data, render_figures
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -16,104 +19,43 @@ warnings.filterwarnings('ignore')
 plt.rcParams['font.family'] = 'DejaVu Sans'
 plt.rcParams['axes.unicode_minus'] = False
 
-def load_and_filter_data(file_path):
-    """データの読み込みと8月22日0時以降のフィルタリング"""
-    print("Loading and filtering data...")
-    
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    data = []
-    current_record = None
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        if line.startswith('2025/'):
-            if current_record:
-                data.append(current_record)
-            
-            parts = line.split(',', 4)
-            if len(parts) >= 5:
-                current_record = {
-                    'timestamp': parts[0],
-                    'report_type': parts[1],
-                    'satellite': parts[2],
-                    'priority': parts[3],
-                    'message': parts[4]
-                }
-        else:
-            if current_record:
-                current_record['message'] += '\n' + line
-    
-    if current_record:
-        data.append(current_record)
-    
-    df = pd.DataFrame(data)
-    df['timestamp'] = pd.to_datetime(df['timestamp'], format='%Y/%m/%d %H:%M:%S JST')
-    
-    # Filter data from August 22, 2025 00:00:00 onwards
-    filter_date = pd.to_datetime('2025-08-22 00:00:00')
-    df_filtered = df[df['timestamp'] >= filter_date].copy()
-    
-    # Add date and time columns
-    df_filtered['date'] = df_filtered['timestamp'].dt.date
-    df_filtered['hour'] = df_filtered['timestamp'].dt.hour
-    df_filtered['day_of_week'] = df_filtered['timestamp'].dt.day_name()
-    
-    print(f"Original data: {len(df)} records")
-    print(f"Filtered data (from Aug 22, 00:00): {len(df_filtered)} records")
-    print(f"Filter period: {df_filtered['timestamp'].min()} to {df_filtered['timestamp'].max()}")
-    
-    return df_filtered
-
-def create_hourly_trend_visualization(df):
-    """1時間毎のトレンド可視化を作成"""
-    print("\n=== Creating Hourly Trend Visualization ===")
-    
+def aggregate_hourly_counts(df):
+    """1時間毎のレポート数を集計"""
     # Create hourly time series data
-    start_time = pd.to_datetime('2025-08-22 00:00:00')
+    start_time = FILTER_START
     end_time = df['timestamp'].max()
     
     # Generate hourly intervals
-    hourly_intervals = pd.date_range(start=start_time, end=end_time, freq='H')
-    
-    # Create empty DataFrame for hourly data
-    hourly_data = []
-    
-    for hour_start in hourly_intervals:
-        hour_end = hour_start + timedelta(hours=1)
-        
-        # Filter data for this hour
-        hour_data = df[(df['timestamp'] >= hour_start) & (df['timestamp'] < hour_end)]
-        
-        # Count by report type
-        dc_report_count = len(hour_data[hour_data['report_type'] == 'DC Report'])
-        dcx_count = len(hour_data[hour_data['report_type'] == 'DCX'])
-        total_count = len(hour_data)
-        
-        hourly_data.append({
-            'hour_start': hour_start,
-            'hour_end': hour_end,
-            'dc_report': dc_report_count,
-            'dcx': dcx_count,
-            'total': total_count
-        })
-    
-    hourly_df = pd.DataFrame(hourly_data)
+    hourly_intervals = pd.date_range(start=start_time, end=end_time, freq='h')
+    
+    # Count each hour by report type in a single pass over the timestamps
+    counts = (df.groupby([pd.Grouper(key='timestamp', freq='1h'), 'report_type'], observed=True).size()
+              .unstack(fill_value=0)
+              .reindex(hourly_intervals, fill_value=0))
+    counts = counts.reindex(columns=['DC Report', 'DCX'], fill_value=0).assign(total=counts.sum(axis=1))
+    
+    hourly_df = pd.DataFrame({
+        'hour_start': hourly_intervals,
+        'hour_end': hourly_intervals + pd.Timedelta(hours=1),
+        'dc_report': counts['DC Report'].to_numpy(),
+        'dcx': counts['DCX'].to_numpy(),
+        'total': counts['total'].to_numpy()
+    })
     
+    return hourly_df
+
+def create_hourly_trend_visualization(hourly_df):
+    """1時間毎のトレンド可視化を作成（別プロセスで描画し、保存したファイル名を返す）"""
     # Create visualization
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 12))
     
     # Plot 1: Hourly counts by report type
-    x_pos = range(len(hourly_df))
+    x_pos = np.arange(len(hourly_df))
     width = 0.35
     
-    ax1.bar([x - width/2 for x in x_pos], hourly_df['dc_report'], width, 
+    ax1.bar(x_pos - width/2, hourly_df['dc_report'], width, 
             label='DC Report (Disaster Management)', color='#2E86AB', alpha=0.8)
-    ax1.bar([x + width/2 for x in x_pos], hourly_df['dcx'], width, 
+    ax1.bar(x_pos + width/2, hourly_df['dcx'], width, 
             label='DCX (Test Messages)', color='#A23B72', alpha=0.8)
     
     ax1.set_xlabel('Hour (from Aug 22, 00:00)')
@@ -122,27 +64,21 @@ def create_hourly_trend_visualization(df):
     ax1.legend()
     ax1.grid(True, alpha=0.3)
     
-    # Set x-axis labels for every 6 hours
-    x_labels = []
-    for i, hour_start in enumerate(hourly_df['hour_start']):
-        if i % 6 == 0 or i == len(hourly_df) - 1:
-            x_labels.append(hour_start.strftime('%m/%d %H:%M'))
-        else:
-            x_labels.append('')
+    # Set x-axis labels for every 6 hours (and the last hour), blank elsewhere
+    show_label = (x_pos % 6 == 0) | (x_pos == len(hourly_df) - 1)
+    x_labels = np.where(show_label, hourly_df['hour_start'].dt.strftime('%m/%d %H:%M'), '')
     
     ax1.set_xticks(x_pos)
     ax1.set_xticklabels(x_labels, rotation=45)
     
-    # Plot 2: Cumulative trend
-    hourly_df['dc_report_cumulative'] = hourly_df['dc_report'].cumsum()
-    hourly_df['dcx_cumulative'] = hourly_df['dcx'].cumsum()
-    hourly_df['total_cumulative'] = hourly_df['total'].cumsum()
+    # Plot 2: Cumulative trend (one cumsum over the three count columns)
+    cumulative = hourly_df[['dc_report', 'dcx', 'total']].cumsum().to_numpy()
     
-    ax2.plot(x_pos, hourly_df['dc_report_cumulative'], 
+    ax2.plot(x_pos, cumulative[:, 0], 
              label='DC Report (Cumulative)', color='#2E86AB', linewidth=2, marker='o')
-    ax2.plot(x_pos, hourly_df['dcx_cumulative'], 
+    ax2.plot(x_pos, cumulative[:, 1], 
              label='DCX (Cumulative)', color='#A23B72', linewidth=2, marker='s')
-    ax2.plot(x_pos, hourly_df['total_cumulative'], 
+    ax2.plot(x_pos, cumulative[:, 2], 
              label='Total (Cumulative)', color='#F18F01', linewidth=2, marker='^')
     
     ax2.set_xlabel('Hour (from Aug 22, 00:00)')
@@ -156,27 +92,26 @@ def create_hourly_trend_visualization(df):
     ax2.set_xticklabels(x_labels, rotation=45)
     
     plt.tight_layout()
-    plt.savefig('hourly_trend_analysis.png', dpi=300, bbox_inches='tight')
-    print("Hourly trend visualization saved as 'hourly_trend_analysis.png'")
-    
+    plt.savefig('hourly_trend_analysis.png', dpi=DPI, bbox_inches='tight', metadata=PNG_METADATA)
+    plt.close(fig)
+    return 'hourly_trend_analysis.png'
+
+def print_hourly_statistics(hourly_df):
+    """1時間毎の統計を表示"""
     # Create detailed hourly statistics
     print("\n=== Hourly Statistics ===")
     print("Hour-by-hour breakdown:")
-    for i, row in hourly_df.iterrows():
-        hour_str = row['hour_start'].strftime('%m/%d %H:%M')
-        print(f"  {hour_str}: DC Report {row['dc_report']}, DCX {row['dcx']}, Total {row['total']}")
-    
-    return hourly_df
+    hour_strs = hourly_df['hour_start'].dt.strftime('%m/%d %H:%M')
+    for hour_str, dc_report, dcx, total in zip(hour_strs, hourly_df['dc_report'], hourly_df['dcx'], hourly_df['total']):
+        print(f"  {hour_str}: DC Report {dc_report}, DCX {dcx}, Total {total}")
 
-def create_enhanced_visualization(df, hourly_df):
-    """拡張された可視化を作成"""
-    print("\n=== Creating Enhanced Visualization ===")
-    
+def create_enhanced_visualization(hourly_df):
+    """拡張された可視化を作成（別プロセスで描画し、保存したファイル名を返す）"""
     # Create a comprehensive visualization
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(20, 16))
     
     # Plot 1: Hourly distribution (stacked bar)
-    x_pos = range(len(hourly_df))
+    x_pos = np.arange(len(hourly_df))
     ax1.bar(x_pos, hourly_df['dc_report'], label='DC Report', color='#2E86AB', alpha=0.8)
     ax1.bar(x_pos, hourly_df['dcx'], bottom=hourly_df['dc_report'], label='DCX', color='#A23B72', alpha=0.8)
     
@@ -187,18 +122,17 @@ def create_enhanced_visualization(df, hourly_df):
     ax1.grid(True, alpha=0.3)
     
     # Set x-axis labels
-    x_labels = [hour_start.strftime('%H:%M') for hour_start in hourly_df['hour_start']]
+    x_labels = hourly_df['hour_start'].dt.strftime('%H:%M').to_numpy()
     ax1.set_xticks(x_pos[::3])  # Show every 3rd label
     ax1.set_xticklabels(x_labels[::3], rotation=45)
     
     # Plot 2: Moving average trend
     window_size = 3
-    dc_report_ma = hourly_df['dc_report'].rolling(window=window_size, center=True).mean()
-    dcx_ma = hourly_df['dcx'].rolling(window=window_size, center=True).mean()
+    moving_average = hourly_df[['dc_report', 'dcx']].rolling(window=window_size, center=True).mean().to_numpy()
     
-    ax2.plot(x_pos, dc_report_ma, label=f'DC Report ({window_size}-hour MA)', 
+    ax2.plot(x_pos, moving_average[:, 0], label=f'DC Report ({window_size}-hour MA)', 
              color='#2E86AB', linewidth=2, marker='o')
-    ax2.plot(x_pos, dcx_ma, label=f'DCX ({window_size}-hour MA)', 
+    ax2.plot(x_pos, moving_average[:, 1], label=f'DCX ({window_size}-hour MA)', 
              color='#A23B72', linewidth=2, marker='s')
     
     ax2.set_xlabel('Hour (from Aug 22, 00:00)')
@@ -212,12 +146,12 @@ def create_enhanced_visualization(df, hourly_df):
     ax2.set_xticklabels(x_labels[::3], rotation=45)
     
     # Plot 3: Ratio analysis
-    hourly_df['dc_report_ratio'] = hourly_df['dc_report'] / (hourly_df['dc_report'] + hourly_df['dcx']) * 100
-    hourly_df['dcx_ratio'] = hourly_df['dcx'] / (hourly_df['dc_report'] + hourly_df['dcx']) * 100
+    dc_report_ratio = hourly_df['dc_report'] / (hourly_df['dc_report'] + hourly_df['dcx']) * 100
+    dcx_ratio = hourly_df['dcx'] / (hourly_df['dc_report'] + hourly_df['dcx']) * 100
     
-    ax3.plot(x_pos, hourly_df['dc_report_ratio'], label='DC Report Ratio (%)', 
+    ax3.plot(x_pos, dc_report_ratio, label='DC Report Ratio (%)', 
              color='#2E86AB', linewidth=2, marker='o')
-    ax3.plot(x_pos, hourly_df['dcx_ratio'], label='DCX Ratio (%)', 
+    ax3.plot(x_pos, dcx_ratio, label='DCX Ratio (%)', 
              color='#A23B72', linewidth=2, marker='s')
     ax3.axhline(y=50, color='gray', linestyle='--', alpha=0.5, label='50% Baseline')
     
@@ -233,12 +167,8 @@ def create_enhanced_visualization(df, hourly_df):
     ax3.set_xticklabels(x_labels[::3], rotation=45)
     
     # Plot 4: Activity heatmap
-    # Create activity matrix for heatmap
-    activity_matrix = []
-    for i, row in hourly_df.iterrows():
-        activity_matrix.append([row['dc_report'], row['dcx']])
-    
-    activity_matrix = np.array(activity_matrix).T
+    # Create activity matrix for heatmap (report types x hours, straight from the columns)
+    activity_matrix = hourly_df[['dc_report', 'dcx']].to_numpy().T
     
     im = ax4.imshow(activity_matrix, cmap='YlOrRd', aspect='auto')
     ax4.set_xlabel('Hour (from Aug 22, 00:00)')
@@ -256,8 +186,9 @@ def create_enhanced_visualization(df, hourly_df):
     cbar.set_label('Number of Reports')
     
     plt.tight_layout()
-    plt.savefig('enhanced_hourly_analysis.png', dpi=300, bbox_inches='tight')
-    print("Enhanced hourly analysis saved as 'enhanced_hourly_analysis.png'")
+    plt.savefig('enhanced_hourly_analysis.png', dpi=DPI, bbox_inches='tight', metadata=PNG_METADATA)
+    plt.close(fig)
+    return 'enhanced_hourly_analysis.png'
 
 def generate_trend_report(hourly_df):
     """トレンド分析レポートを生成"""
@@ -301,9 +232,9 @@ def generate_trend_report(hourly_df):
 ## 時間別詳細
 """
     
-    for i, row in hourly_df.iterrows():
-        hour_str = row['hour_start'].strftime('%m/%d %H:%M')
-        report += f"- **{hour_str}**: DC Report {row['dc_report']} 件, DCX {row['dcx']} 件, 合計 {row['total']} 件\n"
+    hour_strs = hourly_df['hour_start'].dt.strftime('%m/%d %H:%M')
+    for hour_str, dc_report, dcx, total in zip(hour_strs, hourly_df['dc_report'], hourly_df['dcx'], hourly_df['total']):
+        report += f"- **{hour_str}**: DC Report {dc_report} 件, DCX {dcx} 件, 合計 {total} 件\n"
     
     report += f"""
 ## トレンド分析結果
@@ -322,11 +253,20 @@ def main():
     # データ読み込み
     df = load_and_filter_data('dc_reports_boot_00003.csv')
     
-    # 1時間毎トレンド可視化
-    hourly_df = create_hourly_trend_visualization(df)
+    # 1時間毎の集計
+    print("\n=== Creating Hourly Trend Visualization ===")
+    hourly_df = aggregate_hourly_counts(df)
+    
+    # 1時間毎トレンド可視化と拡張可視化（互いに独立なので別プロセスで並行して描画する）
+    trend_file, enhanced_file = render_figures(
+        (create_hourly_trend_visualization, hourly_df),
+        (create_enhanced_visualization, hourly_df),
+    )
+    print(f"Hourly trend visualization saved as '{trend_file}'")
+    print_hourly_statistics(hourly_df)
     
-    # 拡張可視化
-    create_enhanced_visualization(df, hourly_df)
+    print("\n=== Creating Enhanced Visualization ===")
+    print(f"Enhanced hourly analysis saved as '{enhanced_file}'")
     
     # トレンドレポート生成
     report = generate_trend_report(hourly_df)